@@ -9,15 +9,57 @@
 """Download Archives"""
 
 import os
+import _string
+import hashlib
 import logging
+from array import array
 from . import util, formatter
 
 log = logging.getLogger("archive")
 
+sqlite3 = None
+psycopg = None
+
+
+def _import_sqlite3():
+    global sqlite3
+    import sqlite3
+    return sqlite3
+
+
+def _import_psycopg():
+    global psycopg
+    import psycopg
+    return psycopg
+
+
+PRAGMAS_DEFAULT = """\
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-16384;
+PRAGMA busy_timeout=60000;
+"""
+
+# sanitized table name and statement strings per raw table name
+_STMT_CACHE = {}
+_STMT_CACHE_PSQL = {}
+
+# hashes of existing entries per (path, table), shared by all
+# instances so the scan runs at most once per process
+_KNOWN_CACHE = {}
+
+# open connection and refcount per absolute path, so instances
+# targeting the same file share one page cache
+_CON_CACHE = {}
+
 
 def connect(path, prefix, format,
             table=None, mode=None, pragma=None, kwdict=None, cache_key=None):
-    keygen = formatter.parse(prefix + format).format_map
+    template = prefix + format
+    keygen = formatter.parse(template).format_map
+    if "\f" not in template:
+        keygen = _specialize_keygen(template, keygen)
 
     if isinstance(path, str) and path.startswith(
             ("postgres://", "postgresql://")):
@@ -40,67 +82,353 @@ def connect(path, prefix, format,
     return cls(path, keygen, table, pragma, cache_key)
 
 
+def _specialize_keygen(format_string, keygen):
+    """Build a specialized keygen for plain '{field}' replacements
+
+    Templates whose fields are simple name lookups without conversions
+    or format specifiers - the common '{category}_{id}' case - can skip
+    the generic StringFormatter machinery on every generated key.
+    """
+    literals = []
+    names = []
+    try:
+        for literal, name, spec, conv in \
+                _string.formatter_parser(format_string):
+            literals.append(literal)
+            if name is None:
+                continue
+            if conv is not None or spec or not name.isidentifier() or \
+                    name in formatter._GLOBALS:
+                return keygen
+            names.append(name)
+    except Exception:
+        return keygen
+
+    if not names:
+        return keygen
+    while len(literals) <= len(names):
+        literals.append("")
+
+    if len(names) == 1:
+        n0, = names
+        l0, l1 = literals
+
+        def fast(kwdict):
+            try:
+                return f"{l0}{kwdict[n0]}{l1}"
+            except Exception:
+                return keygen(kwdict)
+    elif len(names) == 2:
+        n0, n1 = names
+        l0, l1, l2 = literals
+
+        def fast(kwdict):
+            try:
+                return f"{l0}{kwdict[n0]}{l1}{kwdict[n1]}{l2}"
+            except Exception:
+                return keygen(kwdict)
+    else:
+        def fast(kwdict):
+            try:
+                result = [literals[0]]
+                append = result.append
+                for i, name in enumerate(names, 1):
+                    append(format(kwdict[name]))
+                    append(literals[i])
+                return "".join(result)
+            except Exception:
+                return keygen(kwdict)
+
+    return fast
+
+
 def sanitize(name):
     return f'''"{name.replace('"', '_')}"'''
 
 
+def _hash64(key):
+    """Map 'key' to a stable, signed 64bit integer"""
+    return int.from_bytes(hashlib.blake2b(
+        key.encode(), digest_size=8).digest(), "little") - (1 << 63)
+
+
+def _keyargs_text(key):
+    return (key,)
+
+
+def _keyargs_hash(key):
+    return (_hash64(key), key)
+
+
 class DownloadArchive():
-    _sqlite3 = None
+    _commit_interval = 500
+    _preload_bound = 1 << 20
 
     def __init__(self, path, keygen, table=None, pragma=None, cache_key=None):
-        if self._sqlite3 is None:
-            DownloadArchive._sqlite3 = __import__("sqlite3")
+        if sqlite3 is None:
+            _import_sqlite3()
 
+        if path != ":memory:":
+            path = os.path.abspath(path)
         try:
-            con = self._sqlite3.connect(
-                path, timeout=60, check_same_thread=False)
-        except self._sqlite3.OperationalError:
-            os.makedirs(os.path.dirname(path))
-            con = self._sqlite3.connect(
-                path, timeout=60, check_same_thread=False)
-        con.isolation_level = None
+            entry = _CON_CACHE[path]
+        except KeyError:
+            try:
+                con = sqlite3.connect(
+                    path, timeout=60, check_same_thread=False)
+            except sqlite3.OperationalError:
+                os.makedirs(os.path.dirname(path))
+                con = sqlite3.connect(
+                    path, timeout=60, check_same_thread=False)
+            con.isolation_level = None
+            fresh = True
+            if path != ":memory:":
+                _CON_CACHE[path] = [con, 1]
+        else:
+            entry[1] += 1
+            con = entry[0]
+            fresh = False
 
         self.keygen = keygen
         self.connection = con
-        self.close = con.close
         self.cursor = cursor = con.cursor()
         self._cache_key = cache_key or "_archive_key"
+        self._path = path
+        self._writes = 0
+
+        if table is None:
+            key = None
+            name = table = "archive"
+        else:
+            key = table
+            name = table.replace('"', '_')
+            table = f'"{name}"'
+
+        if fresh:
+            cursor.execute("PRAGMA page_count")
+            if cursor.fetchone()[0] == 0:
+                # fresh database file: larger pages mean fewer, bigger
+                # I/Os, which helps in particular on HDDs and NAS
+                cursor.execute("PRAGMA page_size=65536")
 
-        table = "archive" if table is None else sanitize(table)
-        self._stmt_select = (
-            f"SELECT 1 "
-            f"FROM {table} "
-            f"WHERE entry=? "
-            f"LIMIT 1")
-        self._stmt_insert = (
-            f"INSERT OR IGNORE INTO {table} "
-            f"(entry) VALUES (?)")
+            cursor.executescript(PRAGMAS_DEFAULT)
+            if path != ":memory:":
+                cursor.execute("PRAGMA journal_mode=WAL")
 
         if pragma:
             for stmt in pragma:
                 cursor.execute(f"PRAGMA {stmt}")
 
-        try:
-            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} "
-                           f"(entry TEXT PRIMARY KEY) WITHOUT ROWID")
-        except self._sqlite3.OperationalError:
-            # fallback for missing WITHOUT ROWID support (#553)
+        cursor.execute("SELECT 1 FROM sqlite_master "
+                       "WHERE type='table' AND name=?", (name,))
+        if cursor.fetchone() is None:
+            # fresh archive: 8-byte hash as primary key keeps the
+            # B-tree narrow; 'entry' is retained for display/debugging
             cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} "
-                           f"(entry TEXT PRIMARY KEY)")
+                           f"(h INTEGER PRIMARY KEY, entry TEXT NOT NULL)")
+            hashed = True
+        else:
+            # existing archives keep their original layout
+            cursor.execute(f"PRAGMA table_info({table})")
+            hashed = cursor.fetchone()[1] == "h"
+        if hashed:
+            self._keyargs = _keyargs_hash
+            self._bind = self._bind_hash
+            self._args = [None, None]
+        else:
+            self._keyargs = _keyargs_text
+            self._bind = self._bind_text
+            self._args = [None]
 
-    def add(self, kwdict):
-        """Add item described by 'kwdict' to archive"""
-        key = kwdict.get(self._cache_key) or self.keygen(kwdict)
-        self.cursor.execute(self._stmt_insert, (key,))
+        try:
+            self._stmt_select, self._stmt_insert, \
+                self._stmt_upsert = _STMT_CACHE[key, hashed]
+        except KeyError:
+            if hashed:
+                self._stmt_select = (
+                    f"SELECT 1 "
+                    f"FROM {table} "
+                    f"WHERE h=? AND entry=? "
+                    f"LIMIT 1")
+                self._stmt_insert = (
+                    f"INSERT OR IGNORE INTO {table} "
+                    f"(h, entry) VALUES (?, ?)")
+                if sqlite3.sqlite_version_info >= (3, 35):
+                    self._stmt_upsert = (
+                        f"INSERT INTO {table} (h, entry) VALUES (?, ?) "
+                        f"ON CONFLICT DO NOTHING RETURNING 1")
+                else:
+                    self._stmt_upsert = None
+            else:
+                self._stmt_select = (
+                    f"SELECT 1 "
+                    f"FROM {table} "
+                    f"WHERE entry=? "
+                    f"LIMIT 1")
+                self._stmt_insert = (
+                    f"INSERT OR IGNORE INTO {table} "
+                    f"(entry) VALUES (?)")
+                if sqlite3.sqlite_version_info >= (3, 35):
+                    self._stmt_upsert = (
+                        f"INSERT INTO {table} (entry) VALUES (?) "
+                        f"ON CONFLICT DO NOTHING RETURNING 1")
+                else:
+                    self._stmt_upsert = None
+            _STMT_CACHE[key, hashed] = (
+                self._stmt_select, self._stmt_insert, self._stmt_upsert)
 
-    def check(self, kwdict):
+        try:
+            self._known = _KNOWN_CACHE[path, table]
+        except KeyError:
+            self._known = known = self._preload(table)
+            if path != ":memory:":
+                _KNOWN_CACHE[path, table] = known
+
+    def _preload(self, table):
+        """Collect hashes of existing entries for negative lookups"""
+        cursor = self.cursor
+        count = cursor.execute(
+            f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count > self._preload_bound:
+            return None
+
+        known = set()
+        add = known.add
+        cursor.arraysize = 10000
+        cursor.execute(f"SELECT entry FROM {table}")
+        rows = cursor.fetchmany()
+        while rows:
+            for row in rows:
+                add(hash(row[0]))
+            rows = cursor.fetchmany()
+        return known
+
+    def _bind_text(self, key):
+        # reuse one parameter sequence instead of allocating a tuple
+        # per statement; sqlite3 copies the values during execute()
+        args = self._args
+        args[0] = key
+        return args
+
+    def _bind_hash(self, key):
+        args = self._args
+        args[0] = _hash64(key)
+        args[1] = key
+        return args
+
+    def add(self, kwdict, key=None):
+        """Add item described by 'kwdict' to archive"""
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+        self.cursor.execute(self._stmt_insert, self._bind(key))
+        if self._known is not None:
+            self._known.add(hash(key))
+        self._writes += 1
+        if self._writes >= self._commit_interval:
+            # bound how long the write lock is held
+            self._commit()
+
+    def bulk_add(self, kwdicts):
+        """Add all items in 'kwdicts' to archive in a single batch"""
+        keygen = self.keygen
+        cache_key = self._cache_key
+        keys = [kwdict.get(cache_key) or keygen(kwdict)
+                for kwdict in kwdicts]
+        if not keys:
+            return
+        self._commit()
+        self._write(keys)
+        if self._known is not None:
+            add = self._known.add
+            for key in keys:
+                add(hash(key))
+
+    def check(self, kwdict, key=None):
         """Return True if the item described by 'kwdict' exists in archive"""
-        key = kwdict[self._cache_key] = self.keygen(kwdict)
-        self.cursor.execute(self._stmt_select, (key,))
+        if key is None:
+            key = kwdict[self._cache_key] = self.keygen(kwdict)
+        known = self._known
+        if known is not None and hash(key) not in known:
+            return None
+        self.cursor.execute(self._stmt_select, self._bind(key))
         return self.cursor.fetchone()
 
+    def check_and_add(self, kwdict, key=None):
+        """Add item to archive; return True if it was not present before"""
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+
+        known = self._known
+        if known is not None:
+            h = hash(key)
+            if h not in known:
+                known.add(h)
+                self.cursor.execute(self._stmt_insert, self._bind(key))
+                self._writes += 1
+                if self._writes >= self._commit_interval:
+                    self._commit()
+                return True
+
+        if self._stmt_upsert is None:
+            self.cursor.execute(self._stmt_select, self._bind(key))
+            if self.cursor.fetchone() is not None:
+                return False
+            self.cursor.execute(self._stmt_insert, self._bind(key))
+            self._writes += 1
+            if self._writes >= self._commit_interval:
+                self._commit()
+            return True
+
+        self.cursor.execute(self._stmt_upsert, self._bind(key))
+        new = self.cursor.fetchone() is not None
+        if new:
+            self._writes += 1
+            if self._writes >= self._commit_interval:
+                self._commit()
+        return new
+
     def finalize(self):
-        pass
+        self._commit()
+
+    def close(self):
+        self._commit()
+        entry = _CON_CACHE.get(self._path)
+        if entry is None or entry[0] is not self.connection:
+            self.connection.close()
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _CON_CACHE[self._path]
+            self.connection.close()
+
+    def _commit(self):
+        self._writes = 0
+        if self.connection.in_transaction:
+            self.cursor.execute("COMMIT")
+
+    def _write(self, keys):
+        """Write all 'keys' to the database in a single transaction"""
+        cursor = self.cursor
+        keyargs = self._keyargs
+
+        if self.connection.in_transaction:
+            # the connection may be shared with other instances;
+            # commit their pending batch so a failure below cannot
+            # roll it back as well
+            cursor.execute("COMMIT")
+
+        with self.connection:
+            cursor.execute("BEGIN")
+            stmt = self._stmt_insert
+            if len(keys) < 100:
+                for key in keys:
+                    cursor.execute(stmt, keyargs(key))
+            else:
+                cursor.executemany(stmt, (keyargs(key) for key in keys))
 
 
 class DownloadArchiveMemory(DownloadArchive):
@@ -108,62 +436,128 @@ class DownloadArchiveMemory(DownloadArchive):
     def __init__(self, path, keygen, table=None, pragma=None, cache_key=None):
         DownloadArchive.__init__(
             self, path, keygen, table, pragma, cache_key)
-        self.keys = set()
-
-    def add(self, kwdict):
-        self.keys.add(
-            kwdict.get(self._cache_key) or
-            self.keygen(kwdict))
-
-    def check(self, kwdict):
-        key = kwdict[self._cache_key] = self.keygen(kwdict)
-        if key in self.keys:
+        # pending keys as contiguous UTF-8 plus end offsets, instead
+        # of one str object per key; _pending maps each key's hash to
+        # its offset index so hits can be verified against the exact
+        # key instead of trusting the 64bit hash alone
+        self._pending = {}
+        self._buf = bytearray()
+        self._offsets = array("I", (0,))
+
+    def _buffered(self, key, h):
+        """Return True if the exact 'key' is in the pending buffer"""
+        i = self._pending.get(h)
+        if i is None:
+            return False
+        offsets = self._offsets
+        return self._buf[offsets[i]:offsets[i+1]] == key.encode()
+
+    def add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        h = hash(key)
+        if self._buffered(key, h):
+            return
+        self._pending[h] = len(self._offsets) - 1
+        self._buf += key.encode()
+        self._offsets.append(len(self._buf))
+
+    def bulk_add(self, kwdicts):
+        keygen = self.keygen
+        cache_key = self._cache_key
+        pending = self._pending
+        buf = self._buf
+        offsets = self._offsets
+        for kwdict in kwdicts:
+            key = kwdict.get(cache_key) or keygen(kwdict)
+            h = hash(key)
+            if self._buffered(key, h):
+                continue
+            pending[h] = len(offsets) - 1
+            buf += key.encode()
+            offsets.append(len(buf))
+
+    def check(self, kwdict, key=None):
+        if key is None:
+            key = kwdict[self._cache_key] = self.keygen(kwdict)
+        h = hash(key)
+        if self._buffered(key, h):
             return True
-        self.cursor.execute(self._stmt_select, (key,))
+        known = self._known
+        if known is not None and h not in known:
+            return None
+        self.cursor.execute(self._stmt_select, self._bind(key))
         return self.cursor.fetchone()
 
+    def check_and_add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        h = hash(key)
+        if self._buffered(key, h):
+            return False
+        known = self._known
+        if known is None or h in known:
+            self.cursor.execute(self._stmt_select, self._bind(key))
+            if self.cursor.fetchone() is not None:
+                return False
+        self._pending[h] = len(self._offsets) - 1
+        self._buf += key.encode()
+        self._offsets.append(len(self._buf))
+        return True
+
     def finalize(self):
-        if not self.keys:
+        if not self._buf:
             return
-
-        cursor = self.cursor
-        with self.connection:
-            try:
-                cursor.execute("BEGIN")
-            except self._sqlite3.OperationalError:
-                pass
-
-            stmt = self._stmt_insert
-            if len(self.keys) < 100:
-                for key in self.keys:
-                    cursor.execute(stmt, (key,))
-            else:
-                cursor.executemany(stmt, ((key,) for key in self.keys))
+        buf = self._buf
+        offsets = self._offsets
+        self._write([buf[a:b].decode()
+                     for a, b in zip(offsets, offsets[1:])])
+        if self._known is not None:
+            # _pending's keys are the hashes of all flushed entries
+            self._known.update(self._pending)
+        self._pending = {}
+        self._buf = bytearray()
+        self._offsets = array("I", (0,))
 
 
 class DownloadArchivePostgresql():
-    _psycopg = None
+    _savepoint_interval = 500
 
     def __init__(self, uri, keygen, table=None, pragma=None, cache_key=None):
-        if self._psycopg is None:
-            DownloadArchivePostgresql._psycopg = __import__("psycopg")
+        if psycopg is None:
+            _import_psycopg()
 
-        self.connection = con = self._psycopg.connect(uri)
+        self.connection = con = psycopg.connect(uri)
         self.cursor = cursor = con.cursor()
-        self.close = con.close
         self.keygen = keygen
         self._cache_key = cache_key or "_archive_key"
+        self._pipeline = None
+        self._dirty = False
+        self._writes = 0
+        self._savepoint = False
 
-        table = "archive" if table is None else sanitize(table)
-        self._stmt_select = (
-            f"SELECT true "
-            f"FROM {table} "
-            f"WHERE entry=%s "
-            f"LIMIT 1")
-        self._stmt_insert = (
-            f"INSERT INTO {table} (entry) "
-            f"VALUES (%s) "
-            f"ON CONFLICT DO NOTHING")
+        try:
+            table, self._stmt_select, self._stmt_insert, \
+                self._stmt_upsert = _STMT_CACHE_PSQL[table]
+        except KeyError:
+            key = table
+            table = "archive" if table is None else sanitize(table)
+            self._stmt_select = (
+                f"SELECT true "
+                f"FROM {table} "
+                f"WHERE entry=%s "
+                f"LIMIT 1")
+            self._stmt_insert = (
+                f"INSERT INTO {table} (entry) "
+                f"VALUES (%s) "
+                f"ON CONFLICT DO NOTHING")
+            self._stmt_upsert = (
+                f"INSERT INTO {table} (entry) "
+                f"VALUES (%s) "
+                f"ON CONFLICT DO NOTHING "
+                f"RETURNING true")
+            _STMT_CACHE_PSQL[key] = (table, self._stmt_select,
+                                     self._stmt_insert, self._stmt_upsert)
 
         try:
             cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} "
@@ -175,29 +569,137 @@ class DownloadArchivePostgresql():
             con.rollback()
             raise
 
-    def add(self, kwdict):
-        key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+    def add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        if self._pipeline is None:
+            self._open_pipeline()
         try:
-            self.cursor.execute(self._stmt_insert, (key,))
-            self.connection.commit()
+            if not self._writes:
+                self.cursor.execute("SAVEPOINT gdl_archive")
+                self._savepoint = True
+            self.cursor.execute(self._stmt_insert, (key,), prepare=True)
+            self._dirty = True
+            self._writes += 1
+            if self._writes >= self._savepoint_interval:
+                self._writes = 0
+                self._savepoint = False
+                self.cursor.execute("RELEASE SAVEPOINT gdl_archive")
         except Exception as exc:
             log.error("%s: %s when writing entry: %s",
                       self.connection, exc.__class__.__name__, exc)
-            self.connection.rollback()
+            self._rollback()
+
+    def bulk_add(self, kwdicts):
+        keygen = self.keygen
+        cache_key = self._cache_key
+        keys = [(kwdict.get(cache_key) or keygen(kwdict),)
+                for kwdict in kwdicts]
+        if not keys:
+            return
+        try:
+            self.cursor.executemany(self._stmt_insert, keys)
+            self._dirty = True
+        except Exception as exc:
+            log.error("%s: %s when writing entries: %s",
+                      self.connection, exc.__class__.__name__, exc)
+            self._rollback()
 
-    def check(self, kwdict):
-        key = kwdict[self._cache_key] = self.keygen(kwdict)
+    def check(self, kwdict, key=None):
+        if key is None:
+            key = kwdict[self._cache_key] = self.keygen(kwdict)
         try:
-            self.cursor.execute(self._stmt_select, (key,))
+            self.cursor.execute(self._stmt_select, (key,), prepare=True)
+            if self._pipeline is not None:
+                self._pipeline.sync()
             return self.cursor.fetchone()
         except Exception as exc:
             log.error("%s: %s when checking entry: %s",
                       self.connection, exc.__class__.__name__, exc)
-            self.connection.rollback()
+            self._rollback()
             return False
 
+    def check_and_add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        try:
+            self.cursor.execute(self._stmt_upsert, (key,), prepare=True)
+            self._dirty = True
+            if self._pipeline is not None:
+                self._pipeline.sync()
+            return self.cursor.fetchone() is not None
+        except Exception as exc:
+            log.error("%s: %s when writing entry: %s",
+                      self.connection, exc.__class__.__name__, exc)
+            self._rollback()
+            return True
+
     def finalize(self):
-        pass
+        self._commit()
+
+    def close(self):
+        self._commit()
+        try:
+            self.connection.close()
+        except Exception as exc:
+            log.error("%s: %s when closing connection: %s",
+                      self.connection, exc.__class__.__name__, exc)
+
+    def _open_pipeline(self):
+        try:
+            self._pipeline = self.connection.pipeline()
+            self._pipeline.__enter__()
+        except Exception:
+            # pipeline mode unsupported by server or libpq
+            self._pipeline = None
+
+    def _commit(self):
+        try:
+            if self._pipeline is not None:
+                pipeline, self._pipeline = self._pipeline, None
+                # deferred statement errors surface here
+                pipeline.__exit__(None, None, None)
+            self._savepoint = False
+            if self._dirty:
+                self._dirty = False
+                self._writes = 0
+                self.connection.commit()
+        except Exception as exc:
+            log.error("%s: %s when committing entries: %s",
+                      self.connection, exc.__class__.__name__, exc)
+            self._rollback()
+
+    def _rollback(self):
+        """Discard the current batch without raising"""
+        self._writes = 0
+
+        # leave pipeline mode first; psycopg forbids rolling back
+        # while a pipeline is active
+        pipeline, self._pipeline = self._pipeline, None
+        if pipeline is not None:
+            try:
+                pipeline.__exit__(None, None, None)
+            except Exception:
+                pass
+
+        try:
+            if self._savepoint:
+                # discard only the current savepoint batch
+                self._savepoint = False
+                self.cursor.execute("ROLLBACK TO SAVEPOINT gdl_archive")
+                self.cursor.execute("RELEASE SAVEPOINT gdl_archive")
+            else:
+                self._dirty = False
+                self.connection.rollback()
+        except Exception as exc:
+            log.error("%s: %s when discarding entries: %s",
+                      self.connection, exc.__class__.__name__, exc)
+            self._dirty = False
+            self._savepoint = False
+            try:
+                self.connection.rollback()
+            except Exception:
+                pass
 
 
 class DownloadArchivePostgresqlMemory(DownloadArchivePostgresql):
@@ -205,19 +707,44 @@ class DownloadArchivePostgresqlMemory(DownloadArchivePostgresql):
     def __init__(self, path, keygen, table=None, pragma=None, cache_key=None):
         DownloadArchivePostgresql.__init__(
             self, path, keygen, table, pragma, cache_key)
-        self.keys = set()
+        self._pending = {}
+        self._buf = bytearray()
+        self._offsets = array("I", (0,))
 
-    def add(self, kwdict):
-        self.keys.add(
-            kwdict.get(self._cache_key) or
-            self.keygen(kwdict))
+    _buffered = DownloadArchiveMemory._buffered
 
-    def check(self, kwdict):
-        key = kwdict[self._cache_key] = self.keygen(kwdict)
-        if key in self.keys:
+    def add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        h = hash(key)
+        if self._buffered(key, h):
+            return
+        self._pending[h] = len(self._offsets) - 1
+        self._buf += key.encode()
+        self._offsets.append(len(self._buf))
+
+    def bulk_add(self, kwdicts):
+        keygen = self.keygen
+        cache_key = self._cache_key
+        pending = self._pending
+        buf = self._buf
+        offsets = self._offsets
+        for kwdict in kwdicts:
+            key = kwdict.get(cache_key) or keygen(kwdict)
+            h = hash(key)
+            if self._buffered(key, h):
+                continue
+            pending[h] = len(offsets) - 1
+            buf += key.encode()
+            offsets.append(len(buf))
+
+    def check(self, kwdict, key=None):
+        if key is None:
+            key = kwdict[self._cache_key] = self.keygen(kwdict)
+        if self._buffered(key, hash(key)):
             return True
         try:
-            self.cursor.execute(self._stmt_select, (key,))
+            self.cursor.execute(self._stmt_select, (key,), prepare=True)
             return self.cursor.fetchone()
         except Exception as exc:
             log.error("%s: %s when checking entry: %s",
@@ -225,15 +752,41 @@ class DownloadArchivePostgresqlMemory(DownloadArchivePostgresql):
             self.connection.rollback()
             return False
 
+    def check_and_add(self, kwdict, key=None):
+        if key is None:
+            key = kwdict.get(self._cache_key) or self.keygen(kwdict)
+        h = hash(key)
+        if self._buffered(key, h):
+            return False
+        try:
+            self.cursor.execute(self._stmt_select, (key,), prepare=True)
+            if self.cursor.fetchone() is not None:
+                return False
+        except Exception as exc:
+            log.error("%s: %s when checking entry: %s",
+                      self.connection, exc.__class__.__name__, exc)
+            self.connection.rollback()
+        self._pending[h] = len(self._offsets) - 1
+        self._buf += key.encode()
+        self._offsets.append(len(self._buf))
+        return True
+
     def finalize(self):
-        if not self.keys:
+        if not self._buf:
             return
+        buf = self._buf
+        offsets = self._offsets
         try:
             self.cursor.executemany(
                 self._stmt_insert,
-                ((key,) for key in self.keys))
+                ((buf[a:b].decode(),)
+                 for a, b in zip(offsets, offsets[1:])))
             self.connection.commit()
         except Exception as exc:
             log.error("%s: %s when writing entries: %s",
                       self.connection, exc.__class__.__name__, exc)
             self.connection.rollback()
+        else:
+            self._pending = {}
+            self._buf = bytearray()
+            self._offsets = array("I", (0,))
@@ -325,17 +325,21 @@ class DownloadJob(Job):
             for callback in hooks["prepare"]:
                 callback(pathfmt)
 
-        if archive is not None and archive.check(kwdict):
-            pathfmt.fix_extension()
-            self.handle_skip()
-            return
+        if archive is None:
+            archive_key = None
+        else:
+            archive_key = archive.keygen(kwdict)
+            if archive.check(kwdict, archive_key):
+                pathfmt.fix_extension()
+                self.handle_skip()
+                return
 
         if pathfmt.extension and not self.metadata_http:
             pathfmt.build_path()
 
             if pathfmt.exists():
                 if archive is not None and self._archive_write_skip:
-                    archive.add(kwdict)
+                    archive.add(kwdict, archive_key)
                 self.handle_skip()
                 return
 
@@ -345,7 +349,7 @@ class DownloadJob(Job):
 
             if kwdict.pop("_file_recheck", False) and pathfmt.exists():
                 if archive is not None and self._archive_write_skip:
-                    archive.add(kwdict)
+                    archive.add(kwdict, archive_key)
                 self.handle_skip()
                 return
 
@@ -374,7 +378,7 @@ class DownloadJob(Job):
 
         if not pathfmt.temppath:
             if archive is not None and self._archive_write_skip:
-                archive.add(kwdict)
+                archive.add(kwdict, archive_key)
             self.handle_skip()
             return
 
@@ -388,12 +392,12 @@ class DownloadJob(Job):
         self.out.success(pathfmt.path)
         self._skipcnt = 0
         if archive is not None and self._archive_write_file:
-            archive.add(kwdict)
+            archive.add(kwdict, archive_key)
         if "after" in hooks:
             for callback in hooks["after"]:
                 callback(pathfmt)
         if archive is not None and self._archive_write_after:
-            archive.add(kwdict)
+            archive.add(kwdict, archive_key)
 
     def handle_directory(self, kwdict):
         """Set and create the target directory for downloads"""
@@ -628,7 +632,7 @@ class DownloadJob(Job):
                     self._skipftr = None
         else:
             # monkey-patch methods to always return False
-            pathfmt.exists = lambda x=None: False
+            pathfmt.exists = lambda kwdict=None, key=None: False
             if self.archive is not None:
                 self.archive.check = pathfmt.exists
 
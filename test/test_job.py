@@ -65,6 +65,23 @@ class TestDownloadJob(TestJob):
         self.assertEqual(func(TestExtractorParent), False)
         self.assertEqual(func(TestExtractorAlt)   , False)
 
+    def test_archive_skip_disabled(self):
+        config.set((), "archive", ":memory:")
+        config.set((), "skip", False)
+
+        extr = TestExtractor.from_url("test:")
+        tjob = self.jobclass(extr)
+        tjob.initialize()
+        try:
+            self.assertIsNotNone(tjob.archive)
+            # the patched methods must accept the arguments
+            # handle_url() passes to them
+            self.assertFalse(tjob.pathfmt.exists())
+            self.assertFalse(tjob.archive.check(
+                {"num": 1}, tjob.archive.keygen({"num": 1})))
+        finally:
+            tjob.archive.close()
+
 
 class TestKeywordJob(TestJob):
     jobclass = job.KeywordJob